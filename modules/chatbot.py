@@ -1,9 +1,13 @@
 # Chatbot wrapper: uses Gemini if available, else simple rule-based fallback
+import re
+# all keywords in one alternation so the query is scanned once
+_KEYWORDS = re.compile('minyak|jelantah|cara|pilah')
+
 def reply(question):
     # Mock answers for common queries
-    q=question.lower()
-    if 'minyak' in q or 'jelantah' in q:
+    found=set(_KEYWORDS.findall(question.lower()))
+    if 'minyak' in found or 'jelantah' in found:
         return '- Harga minyak jelantah: Rp 6.500 - 7.200 per liter (estimasi)\\n- Simpan di botol tertutup sebelum penjemputan.'
-    if 'cara' in q and 'pilah' in q:
+    if 'cara' in found and 'pilah' in found:
         return '- Pisahkan plastik, kertas, logam, kaca. Cuci/bersihkan plastik yang berminyak.'
     return 'Maaf, coba tanyakan lagi atau upload foto sampah untuk analisis.'
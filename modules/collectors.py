@@ -1,14 +1,16 @@
 # management functions for collectors/industry
+import pandas as pd
 COLLECTORS_DB = [
     {'name':'Pengepul A','types':['Plastik PET','Kertas'],'price_per_kg':5000,'rating':4.5},
     {'name':'Pengepul B','types':['Plastik PET','HDPE'],'price_per_kg':4000,'rating':4.0},
 ]
+# built once at import; COLLECTORS_DB is static
+_BY_NAME = {c['name']: c for c in COLLECTORS_DB}
+COLLECTORS_DF = pd.DataFrame(COLLECTORS_DB)
 
 def show_profiles():
-    import streamlit as st, pandas as pd
-    st.table(pd.DataFrame(COLLECTORS_DB))
+    import streamlit as st
+    st.table(COLLECTORS_DF)
 
 def get_collector(name):
-    for c in COLLECTORS_DB:
-        if c['name']==name: return c
-    return None
+    return _BY_NAME.get(name)
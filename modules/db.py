@@ -1,30 +1,191 @@
-import sqlite3, os, pandas as pd
+import sqlite3, os, atexit, time, queue, threading, pandas as pd
+from concurrent.futures import Future
+from contextlib import contextmanager
 DB='multiwaste.db'
+WRITE_BATCH=100  # max rows the writer thread commits per transaction
+POOL_SIZE=4  # idle read connections kept open
 
-def init_db():
+# statements are reused verbatim so each pooled connection's statement cache hits
+REQUEST_SQL="INSERT INTO requests (created_at,household,address,material,weight,photo_sha,status) VALUES (?,?,?,?,?,?,'OPEN')"
+# only OPEN requests can be taken, so a stale list can't steal another collector's request
+ASSIGN_SQL="UPDATE requests SET status='ASSIGNED',collector=? WHERE id=? AND status='OPEN'"
+REQUEST_COLUMNS=('id','created_at','household','address','material','weight','status','collector','tx_id','photo_sha')
+# what the Collector's OPEN list shows: status is implied, collector is still empty
+OPEN_LIST_COLUMNS=('id','created_at','household','address','material','weight')
+SELECT_LEDGER_SQL='SELECT * FROM ledger ORDER BY created_at DESC'
+# plain INSERT: a tx_id collision must fail rather than silently replace a row
+LEDGER_SQL='INSERT INTO ledger (tx_id,created_at,household,collector,material,weight,price_per_kg,total,verified) VALUES (?,?,?,?,?,?,?,?,?)'
+
+REQUESTS_SCHEMA='id INTEGER PRIMARY KEY, created_at INTEGER, household TEXT, address TEXT, material TEXT, weight REAL, status TEXT, collector TEXT, tx_id TEXT, photo_sha TEXT'
+
+_pool=queue.Queue(maxsize=POOL_SIZE)
+
+def _connect():
     conn=sqlite3.connect(DB, check_same_thread=False)
-    cur=conn.cursor()
-    cur.execute('''CREATE TABLE IF NOT EXISTS requests (id INTEGER PRIMARY KEY, created_at TEXT, household TEXT, address TEXT, material TEXT, weight REAL, status TEXT, collector TEXT, tx_id TEXT)''')
-    cur.execute('''CREATE TABLE IF NOT EXISTS ledger (tx_id TEXT PRIMARY KEY, created_at TEXT, household TEXT, collector TEXT, material TEXT, weight REAL, price_per_kg REAL, total REAL, verified INTEGER)''')
-    conn.commit()
+    # WAL + synchronous=NORMAL: commits no longer fsync the main db file
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-64000')
     return conn
 
-conn=init_db()
+@contextmanager
+def connection():
+    # borrow a pooled connection; Streamlit starts a fresh script thread on every
+    # rerun, so connections are shared across threads rather than kept per thread
+    try: conn=_pool.get_nowait()
+    except queue.Empty: conn=_connect()
+    try:
+        yield conn
+    finally:
+        try: _pool.put_nowait(conn)
+        except queue.Full: conn.close()
+
+def _migrate_requests(cur):
+    cols={r[1]: r[2] for r in cur.execute('PRAGMA table_info(requests)')}
+    if cols.get('created_at')!='TEXT':
+        if 'photo_sha' not in cols:
+            cur.execute('ALTER TABLE requests ADD COLUMN photo_sha TEXT')
+        return
+    # requests.created_at used to be TEXT; rebuild the table with epoch-ms integers
+    cur.execute('BEGIN')
+    cur.execute('ALTER TABLE requests RENAME TO requests_old')
+    cur.execute(f'CREATE TABLE requests ({REQUESTS_SCHEMA})')
+    cur.execute('''INSERT INTO requests (id,created_at,household,address,material,weight,status,collector,tx_id)
+        SELECT id,CAST(ROUND((julianday(created_at)-2440587.5)*86400000) AS INTEGER),household,address,material,weight,status,collector,tx_id FROM requests_old''')
+    cur.execute('DROP TABLE requests_old')
+    cur.execute('COMMIT')
+
+def init_db():
+    with connection() as conn:
+        cur=conn.cursor()
+        cur.execute(f'CREATE TABLE IF NOT EXISTS requests ({REQUESTS_SCHEMA})')
+        _migrate_requests(cur)
+        cur.execute('''CREATE TABLE IF NOT EXISTS ledger (tx_id TEXT PRIMARY KEY, created_at TEXT, household TEXT, collector TEXT, material TEXT, weight REAL, price_per_kg REAL, total REAL, verified INTEGER)''')
+        cur.execute('''CREATE TABLE IF NOT EXISTS tokens (household TEXT PRIMARY KEY, balance INTEGER)''')
+        # (status, created_at) serves both the filter and the ORDER BY in get_requests; read
+        # backwards it yields created_at DESC, id DESC, the tie-break pagination needs
+        cur.execute('DROP INDEX IF EXISTS idx_requests_status')
+        cur.execute('DROP INDEX IF EXISTS idx_requests_status_created')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_requests_status_created_at ON requests(status, created_at)')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_requests_photo_sha ON requests(photo_sha)')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_ledger_created ON ledger(created_at DESC)')
+        conn.commit()
+
+init_db()
+
+# All writes go through one queue drained by a single writer thread, which
+# commits whatever has piled up (up to WRITE_BATCH rows) in one transaction.
+# Each queued item carries a Future resolved with its rowcount once committed.
+_writes=queue.Queue()
+
+def _write_batch(conn, batch):
+    counts=[]
+    with conn:
+        for sql, rows, _ in batch:
+            counts.append(conn.executemany(sql, rows).rowcount)
+    return counts
+
+def _writer():
+    conn=_connect()
+    while True:
+        batch=[_writes.get()]
+        rows=len(batch[0][1])
+        while rows<WRITE_BATCH:
+            try: item=_writes.get_nowait()
+            except queue.Empty: break
+            batch.append(item)
+            rows+=len(item[1])
+        try:
+            for (_, _, fut), n in zip(batch, _write_batch(conn, batch)):
+                fut.set_result(n)
+        except Exception:
+            # retry each item on its own so one bad item can't sink the others
+            for item in batch:
+                try:
+                    item[2].set_result(_write_batch(conn, [item])[0])
+                except Exception as e:
+                    item[2].set_exception(e)
+        finally:
+            for _ in batch: _writes.task_done()
 
-def add_request(household,address,material,weight):
-    cur=conn.cursor()
-    cur.execute('INSERT INTO requests (created_at,household,address,material,weight,status) VALUES (datetime("now"),?,?,?,?,?)', (household,address,material,weight,'OPEN'))
-    conn.commit()
+threading.Thread(target=_writer, name='db-writer', daemon=True).start()
 
-def get_requests(status='OPEN'):
-    return pd.read_sql_query(f"SELECT * FROM requests WHERE status='{status}'", conn)
+def write_many(sql, rows):
+    # queue rows for the writer thread; the returned Future gives the rowcount
+    # or raises the write's own error
+    fut=Future()
+    rows=list(rows)
+    if rows: _writes.put((sql, rows, fut))
+    else: fut.set_result(0)
+    return fut
+
+def flush():
+    # wait for queued writes to be committed; called before reads and at exit
+    _writes.join()
+
+atexit.register(flush)
+
+def _ledger_row(entry):
+    return (entry['tx_id'], entry['created_at'], entry['household'], entry['collector'], entry['material'], entry['weight'], entry['price_per_kg'], entry['total'], entry.get('verified',0))
+
+def _frame(sql, params=()):
+    # build the DataFrame straight from the cursor instead of going through read_sql_query
+    with connection() as conn:
+        cur=conn.execute(sql, params)
+        return pd.DataFrame.from_records(cur.fetchall(), columns=[d[0] for d in cur.description])
+
+def add_requests_bulk(rows):
+    # rows: iterable of (household,address,material,weight,photo_sha); one epoch-ms timestamp per batch
+    now=int(time.time()*1000)
+    return write_many(REQUEST_SQL, [(now,)+tuple(r) for r in rows]).result()
+
+def add_request(household,address,material,weight,photo_sha=None):
+    return add_requests_bulk([(household,address,material,weight,photo_sha)])
+
+def get_requests(status='OPEN', limit=None, offset=0, columns=None):
+    # status=None returns every request; limit/offset page through the
+    # (status, created_at) index; columns must come from REQUEST_COLUMNS (default: all)
+    if columns is None:
+        columns=REQUEST_COLUMNS
+    unknown=set(columns)-set(REQUEST_COLUMNS)
+    if unknown:
+        raise ValueError(f'unknown request columns: {sorted(unknown)}')
+    flush()
+    sql, params = f"SELECT {','.join(columns)} FROM requests", ()
+    if status is not None:
+        sql, params = sql+' WHERE status=?', (status,)
+    sql+=' ORDER BY created_at DESC, id DESC'
+    if limit is not None:
+        sql, params = sql+' LIMIT ? OFFSET ?', params+(limit, offset)
+    df=_frame(sql, params)
+    if 'created_at' in columns:
+        # converted for display only here, on the rows actually fetched
+        df['created_at']=pd.to_datetime(df['created_at'], unit='ms')
+    return df
+
+def assign_collectors_bulk(pairs):
+    # pairs: iterable of (collector, request_id), committed together;
+    # returns how many requests were actually assigned
+    return write_many(ASSIGN_SQL, pairs).result()
+
+def status_counts():
+    flush()
+    with connection() as conn:
+        return dict(conn.execute('SELECT status, COUNT(*) FROM requests GROUP BY status').fetchall())
+
+def add_ledger_entries_bulk(entries):
+    return write_many(LEDGER_SQL, [_ledger_row(e) for e in entries]).result()
 
 def add_ledger_entry(entry):
-    cur=conn.cursor()
-    cur.execute('INSERT OR REPLACE INTO ledger (tx_id,created_at,household,collector,material,weight,price_per_kg,total,verified) VALUES (?,?,?,?,?,?,?,?,?)',(
-        entry['tx_id'], entry['created_at'], entry['household'], entry['collector'], entry['material'], entry['weight'], entry['price_per_kg'], entry['total'], entry.get('verified',0)
-    ))
-    conn.commit()
+    return write_many(LEDGER_SQL, [_ledger_row(entry)]).result()
+
+def get_ledger_tx_ids():
+    # tx_ids in insertion order, used to rebuild the ledger's merkle tree
+    flush()
+    with connection() as conn:
+        return [r[0] for r in conn.execute('SELECT tx_id FROM ledger ORDER BY rowid')]
 
 def get_ledger_df():
-    return pd.read_sql_query('SELECT * FROM ledger ORDER BY created_at DESC', conn)
+    flush()
+    return _frame(SELECT_LEDGER_SQL)
@@ -1,16 +1,101 @@
-# CPOTL ledger: append-only with hash-based tx_id
-import hashlib, json, datetime
+# CPOTL ledger: append-only with hash-based tx_id and an incremental merkle root
+import hashlib, struct, datetime, threading
 from . import db
 
+_tree_lock=threading.Lock()
+_tree_levels=None  # _tree_levels[0] holds the leaves, _tree_levels[-1] the root
+_cached_root=None
+_LEN=struct.Struct('<I')
+_AMOUNTS=struct.Struct('<dddI')
+
+def _pack_tx(household, collector, material, weight, price_per_kg, total, created_at, seq=0):
+    # fixed field order, strings length-prefixed so field boundaries can't collide;
+    # seq tells apart identical transactions stamped with the same created_at in one batch
+    parts=[]
+    for field in (household, collector, material, created_at):
+        raw=str(field).encode('utf-8')
+        parts.append(_LEN.pack(len(raw)))
+        parts.append(raw)
+    parts.append(_AMOUNTS.pack(weight, price_per_kg, total, seq))
+    return b''.join(parts)
+
+def _hash_pair(left, right):
+    return hashlib.sha256(left+right).digest()
+
+def _calculate_next_level_extend(levels, new_leaf):
+    # append a leaf and rehash only the right-most path up to the root;
+    # an odd node at the end of a level is paired with itself
+    if not levels: levels.append([])
+    levels[0].append(new_leaf)
+    i=0
+    while len(levels[i])>1:
+        level=levels[i]
+        p=(len(level)-1)//2
+        left=level[2*p]
+        right=level[2*p+1] if 2*p+1<len(level) else left
+        if i+1==len(levels): levels.append([])
+        parent=levels[i+1]
+        if p<len(parent): parent[p]=_hash_pair(left, right)
+        else: parent.append(_hash_pair(left, right))
+        i+=1
+
+def _ensure_tree():
+    global _tree_levels
+    if _tree_levels is None:
+        levels=[]
+        for tx_id in db.get_ledger_tx_ids():
+            _calculate_next_level_extend(levels, bytes.fromhex(tx_id))
+        _tree_levels=levels
+
 def record_transaction(household, collector, material, weight, price_per_kg, photo=None):
+    global _cached_root
     now = datetime.datetime.utcnow().isoformat()
     total = weight * price_per_kg
-    payload = {'household':household,'collector':collector,'material':material,'weight':weight,'price_per_kg':price_per_kg,'total':total,'created_at':now}
-    raw = json.dumps(payload, sort_keys=True).encode('utf-8')
+    raw = _pack_tx(household, collector, material, weight, price_per_kg, total, now)
     tx_hash = hashlib.sha256(raw).hexdigest()
     entry = {'tx_id':tx_hash, 'created_at':now, 'household':household, 'collector':collector, 'material':material, 'weight':weight, 'price_per_kg':price_per_kg, 'total':total, 'verified':0}
-    db.add_ledger_entry(entry)
+    with _tree_lock:
+        _ensure_tree()
+        # add_ledger_entry returns only after the row has committed and raises if
+        # it failed, so the tree never gets a leaf the ledger table lacks
+        db.add_ledger_entry(entry)
+        _calculate_next_level_extend(_tree_levels, bytes.fromhex(tx_hash))
+        _cached_root=None
     return entry
 
+def batch_hash(payloads):
+    # hashlib's sha256 is OpenSSL's, which already picks SHA-NI/AVX2 at runtime
+    sha256=hashlib.sha256
+    return [sha256(p).digest() for p in payloads]
+
+def record_transactions_batch(transactions):
+    # transactions: iterable of dicts with record_transaction's arguments;
+    # hashed in one pass and written to the db in a single transaction
+    global _cached_root
+    now = datetime.datetime.utcnow().isoformat()
+    entries=[]
+    for t in transactions:
+        total = t['weight'] * t['price_per_kg']
+        entries.append({'created_at':now, 'household':t['household'], 'collector':t['collector'], 'material':t['material'], 'weight':t['weight'], 'price_per_kg':t['price_per_kg'], 'total':total, 'verified':0})
+    digests = batch_hash([_pack_tx(e['household'], e['collector'], e['material'], e['weight'], e['price_per_kg'], e['total'], now, seq) for seq, e in enumerate(entries)])
+    for e, d in zip(entries, digests):
+        e['tx_id'] = d.hex()
+    with _tree_lock:
+        _ensure_tree()
+        db.add_ledger_entries_bulk(entries)  # committed (or raised) before the tree changes
+        for d in digests:
+            _calculate_next_level_extend(_tree_levels, d)
+        _cached_root=None
+    return entries
+
+def get_merkle_root():
+    # hex root over all tx_ids; recomputed only after a new transaction
+    global _cached_root
+    with _tree_lock:
+        _ensure_tree()
+        if _cached_root is None and _tree_levels:
+            _cached_root=_tree_levels[-1][0].hex()
+        return _cached_root
+
 def get_ledger_df():
     return db.get_ledger_df()
@@ -1,5 +1,14 @@
 # Simple map UI using streamlit's built-in map (lat/lon of collectors)
 import streamlit as st, pandas as pd
+
+@st.cache_data(show_spinner=False)
+def _collectors_frame(collectors):
+    # column-wise build; cached so reruns with the same collectors reuse the frame
+    return pd.DataFrame({
+        'lat': [c.get('lat') for c in collectors],
+        'lon': [c.get('lon') for c in collectors],
+        'name': [c.get('name') for c in collectors],
+    })
+
 def show_collectors_map(collectors):
-    df = pd.DataFrame([{'lat':c.get('lat'), 'lon':c.get('lon'), 'name':c.get('name')} for c in collectors])
-    st.map(df)
+    st.map(_collectors_frame(collectors))
@@ -1,12 +1,18 @@
 # image classification wrapper with optional Gemini (mock fallback)
-import os, base64
+import os, random
 WASTE_TYPES=['Plastik PET','HDPE','PP','Logam','Kertas','Kaca','Minyak Jelantah','Organik']
+CONTAMINATION=['Clean','Slightly contaminated','Contaminated']
+SCORES=range(40,99)
+
+def classify_images_batch(image_paths):
+    # Mocked classifier for a batch: one PRNG call per field for the whole batch
+    n=len(image_paths)
+    labels = random.choices(WASTE_TYPES, k=n)
+    contaminations = random.choices(CONTAMINATION, k=n)
+    scores = random.choices(SCORES, k=n)
+    advice='Bersihkan bagian yang berminyak, lalu keringkan.'
+    return [{'label':l, 'contamination':c, 'recyclability_score':s, 'advice':advice} for l, c, s in zip(labels, contaminations, scores)]
 
 def classify_image(image_path=None):
     # Mocked classifier: returns random-ish classification with contamination and recyclability score
-    import random
-    label = random.choice(WASTE_TYPES)
-    contamination = random.choice(['Clean','Slightly contaminated','Contaminated'])
-    score = random.randint(40,98)
-    advice='Bersihkan bagian yang berminyak, lalu keringkan.'
-    return {'label':label, 'contamination':contamination, 'recyclability_score':score, 'advice':advice}
+    return classify_images_batch([image_path])[0]
@@ -2,6 +2,6 @@
 from . import db
 import uuid
 
-def create_pickup(household,address,collector,material,weight,photo_path=None):
-    db.add_request(household,address,material,weight)
+def create_pickup(household,address,collector,material,weight,photo_path=None,photo_sha=None):
+    db.add_request(household,address,material,weight,photo_sha)
     return {'pickup_id':str(uuid.uuid4()), 'status':'SCHEDULED', 'collector':collector}
@@ -1,16 +1,42 @@
-# Simple token accounting stored in memory/file (prototype)
-import json, os
-STORE='tokens.json'
-if not os.path.exists(STORE):
-    json.dump({}, open(STORE,'w'))
+# Simple token accounting stored in the SQLite tokens table (prototype)
+import atexit, threading
+from collections import Counter
+from . import db
+FLUSH_EVERY=20  # pending awards upserted in one transaction
+MAX_WEIGHT_KG=10000  # keeps balances well inside SQLite's 64-bit INTEGER
+AWARD_SQL='INSERT INTO tokens (household,balance) VALUES (?,?) ON CONFLICT(household) DO UPDATE SET balance=balance+excluded.balance'
+
+_lock=threading.Lock()
+_pending=Counter()
+_pending_awards=0
+
+def flush():
+    global _pending_awards
+    with _lock:
+        rows=list(_pending.items())
+        # clear only once the upsert has committed; a failed write keeps the
+        # awards pending for the next flush
+        db.write_many(AWARD_SQL, rows).result()
+        _pending.clear()
+        _pending_awards=0
+
+atexit.register(flush)
 
 def award_tokens(household, material, weight):
-    data=json.load(open(STORE))
+    global _pending_awards
+    if not 0 <= weight <= MAX_WEIGHT_KG:
+        raise ValueError(f'weight must be between 0 and {MAX_WEIGHT_KG} kg, got {weight}')
     tokens=int(weight*10)  # 10 token/kg example
-    data[household]=data.get(household,0)+tokens
-    json.dump(data, open(STORE,'w'))
+    with _lock:
+        _pending[household]+=tokens
+        _pending_awards+=1
+        full=_pending_awards>=FLUSH_EVERY
+    if full: flush()
     return tokens
 
 def get_balance(household):
-    data=json.load(open(STORE))
-    return data.get(household,0)
+    with _lock:
+        db.flush()
+        with db.connection() as conn:
+            row=conn.execute('SELECT balance FROM tokens WHERE household=?', (household,)).fetchone()
+        return (row[0] if row else 0)+_pending[household]
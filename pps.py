@@ -1,13 +1,58 @@
 import streamlit as st
-from datetime import datetime
 import pandas as pd
-import os
+import hashlib, os, tempfile
 from modules import (
     db, models, matchmaking, scheduler, ledger, tokens, chatbot, dashboard, collectors, price_feed, map_ui
 )
 
 st.set_page_config(page_title='MultiWaste CPOTL', layout='wide')
 st.title('MultiWaste CPOTL — Prototype')
+PAGE_SIZE = 20  # requests per page in the Collector list
+UPLOAD_DIR = 'uploads'
+
+# Streamlit reruns the whole script on every widget change, so DB reads are cached.
+# invalidate_requests() runs after every write made here; the TTL only bounds
+# staleness from writes made outside the app.
+@st.cache_data(ttl=30, show_spinner=False)
+def list_requests(status='OPEN', limit=None, offset=0, columns=None):
+    return db.get_requests(status=status, limit=limit, offset=offset, columns=columns)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def status_counts():
+    return db.status_counts()
+
+@st.cache_data(ttl=10, show_spinner=False)
+def ledger_df():
+    return ledger.get_ledger_df()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def prices():
+    return price_feed.get_prices()
+
+@st.cache_data(show_spinner=False)
+def candidates_frame(material):
+    # COLLECTORS is static, so each material's table is built once
+    return pd.DataFrame(matchmaking.find_collectors_for(material))
+
+def invalidate_requests():
+    list_requests.clear()
+    status_counts.clear()
+
+@st.fragment
+def pick_requests(df, collector_name):
+    # ticking a checkbox reruns only this fragment; the page reruns once requests are taken
+    picked = []
+    for r in df.itertuples(index=False):
+        if st.checkbox(f"#{r.id} {r.material} — {r.weight} kg ({r.household})", key=f"assign_{r.id}"):
+            picked.append((collector_name, int(r.id)))
+    if picked and st.button(f'Ambil {len(picked)} request'):
+        taken = db.assign_collectors_bulk(picked)
+        invalidate_requests()
+        msg = f'{taken} request diambil oleh {collector_name}.'
+        if taken < len(picked):
+            msg += f' {len(picked) - taken} request sudah diambil pengepul lain.'
+        st.session_state['assigned_msg'] = msg
+        st.rerun()
 
 # Simple role selection
 role = st.sidebar.selectbox('Role', ['Household', 'Collector', 'Industry', 'Admin'])
@@ -20,16 +65,28 @@ if role == 'Household':
         address = st.text_area('Alamat')
         uploaded = st.file_uploader('Foto sampah (jpg/png)', type=['jpg','jpeg','png'])
         reported_type = st.selectbox('Jenis (lapor)', models.WASTE_TYPES)
-        est_weight = st.number_input('Perkiraan berat (kg)', min_value=0.0, step=0.1)
+        est_weight = st.number_input('Perkiraan berat (kg)', min_value=0.0, max_value=float(tokens.MAX_WEIGHT_KG), step=0.1)
         submitted = st.form_submit_button('Analisa & Cari Pengepul')
     if submitted:
-        photo_path = None
+        photo_path = photo_sha = None
         if uploaded:
-            os.makedirs('uploads', exist_ok=True)
-            fname = f"uploads/{int(datetime.utcnow().timestamp())}_{uploaded.name}"
-            with open(fname, 'wb') as f:
-                f.write(uploaded.getbuffer())
-            photo_path = fname
+            # content-addressed: the same photo is stored once, however often it is submitted
+            image_bytes = uploaded.getbuffer()
+            photo_sha = hashlib.sha256(image_bytes).hexdigest()
+            ext = os.path.splitext(uploaded.name)[1].lower() or '.jpg'
+            photo_path = os.path.join(UPLOAD_DIR, photo_sha[:2], f'{photo_sha}{ext}')
+            if not os.path.exists(photo_path):
+                # write to a temp file and rename, so an interrupted write never
+                # leaves a truncated file at the content-hash path
+                os.makedirs(os.path.dirname(photo_path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(photo_path), suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(image_bytes)
+                    os.replace(tmp_path, photo_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
         # 1) classify
         classification = models.classify_image(photo_path)
         st.subheader('Hasil Klasifikasi')
@@ -37,24 +94,33 @@ if role == 'Household':
         # 2) matchmaking
         candidates = matchmaking.find_collectors_for(classification['label'])
         st.subheader('Pengepul Tersedia')
-        st.table(pd.DataFrame(candidates))
+        st.table(candidates_frame(classification['label']))
         for c in candidates:
             if st.button(f"Request pickup by {c['name']}", key=f"req_{c['name']}"):
                 # schedule
-                sched = scheduler.create_pickup(name, address, c['name'], classification['label'], est_weight, photo_path)
+                sched = scheduler.create_pickup(name, address, c['name'], classification['label'], est_weight, photo_path, photo_sha)
+                invalidate_requests()
                 # ledger entry
                 tx = ledger.record_transaction(
                     household=name, collector=c['name'], material=classification['label'], weight=est_weight, price_per_kg=c['price_per_kg'], photo=photo_path
                 )
+                ledger_df.clear()
                 # token reward
                 tokens.award_tokens(household=name, material=classification['label'], weight=est_weight)
                 st.success('Pickup requested and recorded in ledger. TX ID: ' + tx['tx_id'])
 
 elif role == 'Collector':
     st.header('Collector — Daftar Request')
-    df = db.get_requests(status='OPEN')
+    collector_name = st.selectbox('Pengepul', [c['name'] for c in matchmaking.COLLECTORS])
+    total_open = status_counts().get('OPEN', 0)
+    pages = max(1, -(-total_open // PAGE_SIZE))
+    page = st.number_input('Halaman', min_value=1, max_value=pages, step=1)
+    st.caption(f'{total_open} request terbuka — halaman {page} dari {pages}')
+    df = list_requests(status='OPEN', limit=PAGE_SIZE, offset=(page-1)*PAGE_SIZE, columns=db.OPEN_LIST_COLUMNS)
     st.dataframe(df)
-    st.write('Collector can accept requests via the Assign button in app logic (stub).')
+    if 'assigned_msg' in st.session_state:
+        st.success(st.session_state.pop('assigned_msg'))
+    pick_requests(df, collector_name)
 
 elif role == 'Industry':
     st.header('Industry / Recycler Dashboard')
@@ -62,10 +128,17 @@ elif role == 'Industry':
 
 else:
     st.header('Admin Dashboard')
+    counts = status_counts()
+    c1, c2, c3 = st.columns(3)
+    c1.metric('Total Requests', sum(counts.values()))
+    c2.metric('Open', counts.get('OPEN', 0))
+    c3.metric('Assigned', counts.get('ASSIGNED', 0))
+    if st.checkbox('Show all requests'):
+        st.dataframe(list_requests(status=None))
     st.subheader('Ledger (recent)')
-    st.dataframe(ledger.get_ledger_df())
+    st.dataframe(ledger_df())
     st.subheader('Price Feed (mock)')
-    st.table(price_feed.get_prices())
+    st.table(prices())
 
 # Sidebar quick links
 st.sidebar.markdown('---')